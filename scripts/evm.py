@@ -20,167 +20,249 @@ from __future__ import annotations
 import argparse
 import csv
 import math
-from dataclasses import dataclass
-from datetime import datetime
+from array import array
+from datetime import date, datetime
+from itertools import accumulate, chain, islice, repeat
+from operator import gt, itemgetter, sub
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional, Sequence, Tuple
 
 
 REQUIRED_COLS = ["Date", "PV", "EV", "AC"]
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d")
+READ_BLOCK_ROWS = 65536
+OUTPUT_COLS = [
+    "Date",
+    "PV_period",
+    "EV_period",
+    "AC_period",
+    "PV_cum",
+    "EV_cum",
+    "AC_cum",
+    "SV",
+    "CV",
+    "SPI",
+    "CPI",
+]
 
 
 def _to_float(x: str) -> float:
+    # Fast path: most cells are plain decimals without a comma (float() strips whitespace itself)
+    if "," not in x:
+        return float(x) if x.strip() else float("nan")
     # Accept "12,345.67" or "12.345,67" style (best effort)
-    s = str(x).strip()
-    if s == "":
-        return float("nan")
-    # If it contains both separators, assume last one is decimal
-    if "," in s and "." in s:
-        if s.rfind(",") > s.rfind("."):
-            s = s.replace(".", "").replace(",", ".")
-        else:
-            s = s.replace(",", "")
-    else:
+    s = x.strip()
+    comma = s.rfind(",")
+    dot = s.rfind(".")
+    if dot < 0:
         # If only comma, treat as decimal comma
-        if "," in s and "." not in s:
-            s = s.replace(",", ".")
+        s = s.replace(",", ".")
+    elif comma > dot:
+        # Both separators: assume last one is decimal
+        s = s.replace(".", "").replace(",", ".")
+    else:
+        s = s.replace(",", "")
     return float(s)
 
 
 def _safe_div(a: float, b: float) -> float:
-    if b == 0 or math.isclose(b, 0.0):
-        return float("nan")
-    return a / b
+    return a / b if b else float("nan")
+
+
+def _match_date_format(s: str) -> Optional[Tuple[datetime, str]]:
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt), fmt
+        except ValueError:
+            pass
+    return None
+
+
+def _detect_date_format(sample: str) -> Optional[str]:
+    match = _match_date_format(sample.strip())
+    return match[1] if match is not None else None
 
 
 def _parse_date(d: str) -> datetime:
     # Accept YYYY-MM-DD or DD/MM/YYYY
-    s = d.strip()
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d"):
+    match = _match_date_format(d.strip())
+    if match is None:
+        raise ValueError(
+            f"Unrecognized Date format: '{d}'. Use YYYY-MM-DD (recommended).")
+    return match[0]
+
+
+def _parse_dates(col: Sequence[str]) -> List[datetime]:
+    # The Date format is uniform within a file: probe it once on the first
+    # cell, then strptime the whole column without the try/except ladder
+    fmt = _detect_date_format(col[0])
+    if fmt is not None:
         try:
-            return datetime.strptime(s, fmt)
+            return list(map(datetime.strptime, map(str.strip, col), repeat(fmt)))
         except ValueError:
-            pass
-    raise ValueError(
-        f"Unrecognized Date format: '{d}'. Use YYYY-MM-DD (recommended).")
+            pass  # Mixed formats: fall back to per-cell detection
+    return list(map(_parse_date, col))
 
 
-@dataclass
-class EVMRow:
-    date: datetime
-    pv: float
-    ev: float
-    ac: float
+def _required_positions(header: List[str]) -> List[int]:
+    # Resolve column positions once; rows are then plain positional lookups
+    pos = {name: i for i, name in enumerate(header)}
+    return [pos[c] for c in REQUIRED_COLS]
 
 
-def read_evm_csv(path: Path) -> List[EVMRow]:
+def _row_dict(header: List[str], r: List[str]) -> Dict[Optional[str], Any]:
+    # Same shape as the row dict csv.DictReader builds (restkey=None, restval=None)
+    d: Dict[Optional[str], Any] = dict(zip(header, r))
+    if len(r) > len(header):
+        d[None] = r[len(header):]
+    else:
+        for key in header[len(r):]:
+            d[key] = None
+    return d
+
+
+def _raise_first_bad_row(rows: Iterable[List[str]], header: List[str], first_row: int) -> None:
+    # Re-scan row by row, in file order, only to report where the input is invalid
+    positions = _required_positions(header)
+    parsers = (_parse_date, _to_float, _to_float, _to_float)
+    for i, r in enumerate(rows, start=first_row):
+        cells = [r[j] if j < len(r) else None for j in positions]
+        vals: List[Any] = []
+        for cell, parse in zip(cells, parsers):
+            if cell is None:
+                raise ValueError(
+                    f"Error parsing row {i}: row has fewer fields than the header")
+            try:
+                vals.append(parse(cell))
+            except Exception as exc:
+                raise ValueError(f"Error parsing row {i}: {exc}") from exc
+
+        if any(map(math.isnan, vals[1:])):
+            raise ValueError(
+                f"Row {i} has empty/non-numeric PV/EV/AC: {_row_dict(header, r)}")
+
+
+class EVMTable(NamedTuple):
+    # One column per field (dates + packed float64 arrays) instead of one object per row
+    dates: List[datetime]
+    pv: array[float]
+    ev: array[float]
+    ac: array[float]
+
+
+def read_evm_csv(path: Path) -> EVMTable:
     if not path.exists():
         raise FileNotFoundError(f"Input file not found: {path}")
 
-    rows: List[EVMRow] = []
+    dates: List[datetime] = []
+    pv, ev, ac = array("d"), array("d"), array("d")
+
     with path.open("r", newline="", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        if reader.fieldnames is None:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
             raise ValueError("CSV has no header row.")
 
-        missing = [c for c in REQUIRED_COLS if c not in reader.fieldnames]
+        missing = [c for c in REQUIRED_COLS if c not in header]
         if missing:
             raise ValueError(
-                f"Missing required columns: {missing}. Found: {reader.fieldnames}")
+                f"Missing required columns: {missing}. Found: {header}")
+
+        get = itemgetter(*_required_positions(header))
+        records = filter(None, reader)  # skip blank data lines, as DictReader does
+
+        # Parse a block of rows at a time so only one block of raw cell strings is alive
+        first_row = 2
+        while True:
+            block = list(islice(records, READ_BLOCK_ROWS))
+            if not block:
+                break
 
-        for i, r in enumerate(reader, start=2):
+            # Parse column by column: map() keeps the per-cell loop out of the interpreter
             try:
-                date = _parse_date(r["Date"])
-                pv = _to_float(r["PV"])
-                ev = _to_float(r["EV"])
-                ac = _to_float(r["AC"])
-            except Exception as e:
-                raise ValueError(f"Error parsing row {i}: {e}") from e
-
-            if any(math.isnan(v) for v in (pv, ev, ac)):
-                raise ValueError(
-                    f"Row {i} has empty/non-numeric PV/EV/AC: {r}")
-
-            rows.append(EVMRow(date=date, pv=pv, ev=ev, ac=ac))
-
-    # Sort by date
-    rows.sort(key=lambda x: x.date)
-    return rows
-
-
-def compute_evm(rows: List[EVMRow], bac: Optional[float]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    cum_pv = 0.0
-    cum_ev = 0.0
-    cum_ac = 0.0
-
-    out: List[Dict[str, Any]] = []
-
-    for r in rows:
-        cum_pv += r.pv
-        cum_ev += r.ev
-        cum_ac += r.ac
-
-        sv = cum_ev - cum_pv
-        cv = cum_ev - cum_ac
-        spi = _safe_div(cum_ev, cum_pv)
-        cpi = _safe_div(cum_ev, cum_ac)
-
-        out.append(
-            {
-                "Date": r.date.strftime("%Y-%m-%d"),
-                "PV_period": r.pv,
-                "EV_period": r.ev,
-                "AC_period": r.ac,
-                "PV_cum": cum_pv,
-                "EV_cum": cum_ev,
-                "AC_cum": cum_ac,
-                "SV": sv,
-                "CV": cv,
-                "SPI": spi,
-                "CPI": cpi,
-            }
-        )
+                date_col, pv_col, ev_col, ac_col = zip(*map(get, block))
+                block_dates = _parse_dates(date_col)
+                block_pv = array("d", map(_to_float, pv_col))
+                block_ev = array("d", map(_to_float, ev_col))
+                block_ac = array("d", map(_to_float, ac_col))
+            except Exception:
+                _raise_first_bad_row(block, header, first_row)
+                raise
+
+            if any(map(math.isnan, chain(block_pv, block_ev, block_ac))):
+                _raise_first_bad_row(block, header, first_row)
+
+            dates += block_dates
+            pv += block_pv
+            ev += block_ev
+            ac += block_ac
+            first_row += len(block)
+
+    # Sort by date: one stable argsort, applied column by column (skipped if already in order)
+    if any(map(gt, dates, islice(dates, 1, None))):
+        order = sorted(range(len(dates)), key=dates.__getitem__)
+        dates = list(map(dates.__getitem__, order))
+        pv = array("d", map(pv.__getitem__, order))
+        ev = array("d", map(ev.__getitem__, order))
+        ac = array("d", map(ac.__getitem__, order))
+    return EVMTable(dates=dates, pv=pv, ev=ev, ac=ac)
+
+
+def compute_evm(table: EVMTable, bac: Optional[float]) -> Tuple[Dict[str, Sequence[Any]], Dict[str, Any]]:
+    pv, ev, ac = table.pv, table.ev, table.ac
+
+    # Running totals per column (initial=0.0 mirrors cum += x)
+    cum_pv = array("d", accumulate(pv, initial=0.0))[1:]
+    cum_ev = array("d", accumulate(ev, initial=0.0))[1:]
+    cum_ac = array("d", accumulate(ac, initial=0.0))[1:]
+
+    dates = list(map(date.isoformat, map(datetime.date, table.dates)))
+    sv = array("d", map(sub, cum_ev, cum_pv))
+    cv = array("d", map(sub, cum_ev, cum_ac))
+    spi = array("d", map(_safe_div, cum_ev, cum_pv))
+    cpi = array("d", map(_safe_div, cum_ev, cum_ac))
+
+    out: Dict[str, Sequence[Any]] = dict(
+        zip(OUTPUT_COLS, (dates, pv, ev, ac, cum_pv, cum_ev, cum_ac, sv, cv, spi, cpi)))
+
+    # Last cumulative values; with no rows nothing has accrued and the indices are undefined
+    nan = float("nan")
+    has_rows = len(dates) > 0
+    pv_last = cum_pv[-1] if has_rows else 0.0
+    ev_last = cum_ev[-1] if has_rows else 0.0
+    ac_last = cum_ac[-1] if has_rows else 0.0
+    sv_last = sv[-1] if has_rows else nan
+    cv_last = cv[-1] if has_rows else nan
+    spi_last = spi[-1] if has_rows else nan
+    cpi_last = cpi[-1] if has_rows else nan
 
     # Determine BAC: if not provided, assume BAC = last cumulative PV (common approximation if baseline = PV time-phased)
-    inferred_bac = out[-1]["PV_cum"] if out else 0.0
-    bac_final = bac if bac is not None else inferred_bac
+    bac_final = bac if bac is not None else pv_last
 
     # EAC variants:
     # - EAC_cpi = BAC / CPI
     # - EAC_cpi_spi = AC + (BAC - EV) / (CPI * SPI)
     # - ETC = EAC - AC
-    last = out[-1] if out else {}
-    cpi_last = float(last.get("CPI", float("nan")))
-    spi_last = float(last.get("SPI", float("nan")))
-    ac_last = float(last.get("AC_cum", 0.0))
-    ev_last = float(last.get("EV_cum", 0.0))
-
-    eac_cpi = _safe_div(bac_final, cpi_last) if not math.isnan(
-        cpi_last) else float("nan")
-    denom = (cpi_last * spi_last) if (not math.isnan(cpi_last)
-                                      and not math.isnan(spi_last)) else float("nan")
-    eac_cpi_spi = ac_last + \
-        _safe_div((bac_final - ev_last),
-                  denom) if not math.isnan(denom) else float("nan")
-
-    etc_cpi = eac_cpi - ac_last if not math.isnan(eac_cpi) else float("nan")
-    etc_cpi_spi = eac_cpi_spi - \
-        ac_last if not math.isnan(eac_cpi_spi) else float("nan")
-
-    vac_cpi = bac_final - eac_cpi if not math.isnan(eac_cpi) else float("nan")
-    vac_cpi_spi = bac_final - \
-        eac_cpi_spi if not math.isnan(eac_cpi_spi) else float("nan")
+    # A NaN CPI/SPI propagates through the arithmetic, so no isnan guards are needed
+    eac_cpi = _safe_div(bac_final, cpi_last)
+    eac_cpi_spi = ac_last + _safe_div(bac_final - ev_last, cpi_last * spi_last)
+
+    etc_cpi = eac_cpi - ac_last
+    etc_cpi_spi = eac_cpi_spi - ac_last
+
+    vac_cpi = bac_final - eac_cpi
+    vac_cpi_spi = bac_final - eac_cpi_spi
 
     summary = {
         "BAC": bac_final,
         "BAC_source": "user" if bac is not None else "inferred_from_last_PV_cum",
-        "PV_cum": float(last.get("PV_cum", 0.0)),
-        "EV_cum": float(last.get("EV_cum", 0.0)),
-        "AC_cum": float(last.get("AC_cum", 0.0)),
-        "SPI": float(last.get("SPI", float("nan"))),
-        "CPI": float(last.get("CPI", float("nan"))),
-        "SV": float(last.get("SV", float("nan"))),
-        "CV": float(last.get("CV", float("nan"))),
+        "PV_cum": pv_last,
+        "EV_cum": ev_last,
+        "AC_cum": ac_last,
+        "SPI": spi_last,
+        "CPI": cpi_last,
+        "SV": sv_last,
+        "CV": cv_last,
         "EAC_CPI": eac_cpi,
         "ETC_CPI": etc_cpi,
         "VAC_CPI": vac_cpi,
@@ -192,24 +274,27 @@ def compute_evm(rows: List[EVMRow], bac: Optional[float]) -> Tuple[List[Dict[str
     return out, summary
 
 
-def write_csv(path: Path, rows: List[Dict[str, Any]]) -> None:
+def write_csv(path: Path, columns: Dict[str, Sequence[Any]]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    if not rows:
+    lengths = {name: len(col) for name, col in columns.items()}
+    if len(set(lengths.values())) > 1:
+        raise ValueError(f"Columns have different lengths: {lengths}")
+    if not any(lengths.values()):
         raise ValueError("No rows to write.")
-    fieldnames = list(rows[0].keys())
     with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+        writer = csv.writer(f)
+        writer.writerow(columns.keys())
+        # Rows are zipped straight from the columns; no per-row dict is built
+        writer.writerows(zip(*columns.values()))
 
 
-def fmt_money(x: float) -> str:
+def fmt_money(x: Optional[float]) -> str:
     if x is None or math.isnan(x):
         return "NA"
     return f"{x:,.2f}"
 
 
-def fmt_ratio(x: float) -> str:
+def fmt_ratio(x: Optional[float]) -> str:
     if x is None or math.isnan(x):
         return "NA"
     return f"{x:.3f}"
@@ -229,8 +314,8 @@ def main() -> None:
     in_path = Path(args.input)
     out_path = Path(args.output)
 
-    rows = read_evm_csv(in_path)
-    detail, summary = compute_evm(rows, args.bac)
+    table = read_evm_csv(in_path)
+    detail, summary = compute_evm(table, args.bac)
     write_csv(out_path, detail)
 
     print("\n=== EVM Executive Summary ===")
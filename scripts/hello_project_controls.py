@@ -1,4 +1,4 @@
-def main():
+def main() -> None:
     print("Project Controls Toolkit initialized successfully.")
 
 